@@ -1,15 +1,28 @@
-from operator import attrgetter
-from typing import Any, Iterator, List
+import sys
+from operator import eq, ge, gt, le, lt, ne
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
 
+import numpy as np
 from colorama import Back, Fore, Style
 
+# Maps the filter() operators to the function implementing them, a missing operator means equality
+_OPERATOR_FUNCTIONS = {
+    None: eq,
+    "eq": eq,
+    "neq": ne,
+    "gt": gt,
+    "gte": ge,
+    "lt": lt,
+    "lte": le,
+}
+
 
 class Alignment:
     """Represents an alignment.
 
     Attributes:
-        subseq1 (str): The first subsequence of the alignment
-        subseq2 (str): The second subsequence of the alignment
+        subseq1 (bytes): The first subsequence of the alignment as ASCII bytes
+        subseq2 (bytes): The second subsequence of the alignment as ASCII bytes
         length (int): The length of the alignment
         num_matches (int): The number of matches in the alignment
         num_mismatches (int): The number of mismatches in the alignment
@@ -18,12 +31,30 @@ class Alignment:
         n_gaps (int): The number of gaps found in the alignment
         score (float): The score of the alignment
         indices ((int, int)): The starting indices for the traceback of the alignment
+
+    An alignment is not meant to be modified once built: the counts of matches and the output
+    strings are cached, and would not follow a change of the attributes.
     """
 
+    __slots__ = (
+        "subseq1",
+        "subseq2",
+        "length",
+        "max_gap_length",
+        "min_gap_length",
+        "n_gaps",
+        "score",
+        "indices",
+        "_num_matches",
+        "_num_mismatches",
+        "_colored",
+        "_strings",
+    )
+
     def __init__(
         self,
-        subseq1: str,
-        subseq2: str,
+        subseq1: Union[str, bytes],
+        subseq2: Union[str, bytes],
         max_gap_length: int,
         min_gap_length: int,
         n_gaps: int,
@@ -32,8 +63,8 @@ class Alignment:
     ) -> None:
         """
         Args:
-            subseq1 (str): The first subsequence of the alignment
-            subseq2 (str): The second subsequence of the alignment
+            subseq1 (str or bytes): The first subsequence of the alignment
+            subseq2 (str or bytes): The second subsequence of the alignment
             max_gap_length (int): The size of the biggest gap found in the alignment
             min_gap_length (int): The size of the smaller gap found in the alignment
             n_gaps (int): The number of gaps found in the alignment
@@ -44,32 +75,79 @@ class Alignment:
         if len(subseq1) != len(subseq2):
             raise ValueError("Something went wrong, the two subsequences are not the same length")
 
+        # Sequences are ASCII so they are stored as bytes, which are compact and NumPy friendly
+        if isinstance(subseq1, str):
+            subseq1 = subseq1.encode("ascii")
+        if isinstance(subseq2, str):
+            subseq2 = subseq2.encode("ascii")
+
         self.subseq1 = subseq1
         self.subseq2 = subseq2
         self.length = len(subseq1)
-        self.num_matches = sum([a == b for a, b in zip(subseq1, subseq2)])
-        self.num_mismatches = sum(["-" not in [a, b] and a != b for a, b in zip(subseq1, subseq2)])
+        # These are computed on first access since most alignments are discarded by filtering
+        self._num_matches = None
+        self._num_mismatches = None
         self.max_gap_length = max_gap_length
         self.min_gap_length = min_gap_length
         self.n_gaps = n_gaps
         self.score = score
         self.indices = indices
+        # Caches for the output strings, see _colored_subsequences() and to_string(). They are only
+        # created for the alignments that get printed
+        self._colored = None
+        self._strings = None
+
+    def _count_matches(self) -> None:
+        """Computes the number of matches and mismatches of the alignment"""
+
+        # Compare the subsequences as byte arrays so that counting is a single vectorized pass
+        a = np.frombuffer(self.subseq1, dtype=np.uint8)
+        b = np.frombuffer(self.subseq2, dtype=np.uint8)
+        equal = a == b
+        gaps = (a == ord("-")) | (b == ord("-"))
+        self._num_matches = int(equal.sum())
+        self._num_mismatches = int((~equal & ~gaps).sum())
+
+    @property
+    def num_matches(self) -> int:
+        if self._num_matches is None:
+            self._count_matches()
+        return self._num_matches
+
+    @property
+    def num_mismatches(self) -> int:
+        if self._num_mismatches is None:
+            self._count_matches()
+        return self._num_mismatches
 
     def _colored_subsequences(self) -> str:
         """This method is needed to provied a colored output to the console"""
-        string1 = ""
-        string2 = ""
-        for c1, c2 in zip(self.subseq1, self.subseq2):
+        if self._colored is not None:
+            return self._colored
+
+        # Bind the colors to local names to avoid looking them up on every character
+        green, yellow, red = Fore.GREEN, Fore.YELLOW, Fore.RED
+
+        parts1 = []
+        parts2 = []
+        previous_color = None
+        for c1, c2 in zip(self.subseq1.decode("ascii"), self.subseq2.decode("ascii")):
             if c1 == c2:
-                string1 += Fore.GREEN + c1
-                string2 += Fore.GREEN + c2
-            elif "-" in [c1, c2]:
-                string1 += Fore.YELLOW + c1
-                string2 += Fore.YELLOW + c2
+                color = green
+            elif c1 == "-" or c2 == "-":
+                color = yellow
             else:
-                string1 += Fore.RED + c1
-                string2 += Fore.RED + c2
-        return f"{string1}\n{string2}{Style.RESET_ALL}"
+                color = red
+
+            # The color is emitted only when it changes, it then applies to the whole run
+            if color != previous_color:
+                parts1.append(color)
+                parts2.append(color)
+                previous_color = color
+            parts1.append(c1)
+            parts2.append(c2)
+        self._colored = f"{''.join(parts1)}\n{''.join(parts2)}{Style.RESET_ALL}"
+        return self._colored
 
     def _get_coloured_if_sorting(self, to_print: str, sort_param: str = None):
         """Returns a coloured string if the parameter to print is the sorting parameter
@@ -88,22 +166,34 @@ class Alignment:
             sort_param (str): If specified highlights the sorting parameter
         """
 
-        printable_subsequences = self._colored_subsequences()
-
         if to_file:
             sort_param = None
-            printable_subsequences = f"{self.subseq1}\n{self.subseq2}"
-
-        return f"""{self._get_coloured_if_sorting('score', sort_param)}
-{self._get_coloured_if_sorting('length', sort_param)}
-{printable_subsequences}
-{self._get_coloured_if_sorting('num_matches', sort_param)}
-{self._get_coloured_if_sorting('num_mismatches', sort_param)}
-{self._get_coloured_if_sorting('max_gap_length', sort_param)}
-{self._get_coloured_if_sorting('min_gap_length', sort_param)}
-{self._get_coloured_if_sorting('n_gaps', sort_param)}
-trace_back_start_indices: {self.indices}
-"""
+
+        cache_key = (to_file, sort_param)
+        if self._strings is None:
+            self._strings = {}
+        elif cache_key in self._strings:
+            return self._strings[cache_key]
+
+        if to_file:
+            printable_subsequences = b"\n".join((self.subseq1, self.subseq2)).decode("ascii")
+        else:
+            printable_subsequences = self._colored_subsequences()
+
+        lines = [
+            self._get_coloured_if_sorting("score", sort_param),
+            self._get_coloured_if_sorting("length", sort_param),
+            printable_subsequences,
+            self._get_coloured_if_sorting("num_matches", sort_param),
+            self._get_coloured_if_sorting("num_mismatches", sort_param),
+            self._get_coloured_if_sorting("max_gap_length", sort_param),
+            self._get_coloured_if_sorting("min_gap_length", sort_param),
+            self._get_coloured_if_sorting("n_gaps", sort_param),
+            f"trace_back_start_indices: {self.indices}",
+            "",
+        ]
+        self._strings[cache_key] = "\n".join(lines)
+        return self._strings[cache_key]
 
     def __str__(self) -> str:
         return self.to_string()
@@ -115,35 +205,51 @@ class Alignments(object):
     This has been created to have a structure to manage better the alignments found and the filtering of those.
 
     Attributes:
-        filter_props (:obj:`dict` of str): The props allowed for filtering the alignments.
-        filter_operators (:obj:`dict` of str): The operators allowed for filtering the alignments.
+        filter_props (:obj:`frozenset` of str): The props allowed for filtering the alignments.
+        filter_operators (:obj:`frozenset` of str): The operators allowed for filtering.
 
         alignments (:obj:`list` of Alignment): This is the actual list of alignments
     """
 
-    filter_props = {
-        "length",
-        "num_matches",
-        "num_mismatches",
-        "max_gap_length",
-        "min_gap_length",
-        "n_gaps",
-        "score",
-    }
+    filter_props = frozenset(
+        {
+            "length",
+            "num_matches",
+            "num_mismatches",
+            "max_gap_length",
+            "min_gap_length",
+            "n_gaps",
+            "score",
+        }
+    )
     filter_operators_map_alpha2symbol = {
+        "eq": "==",
         "neq": "!=",
         "gt": ">",
         "gte": ">=",
         "lt": "<",
         "lte": "<=",
     }
-    filter_operators = filter_operators_map_alpha2symbol.keys()
+    filter_operators = frozenset(filter_operators_map_alpha2symbol)
+
+    def __init__(self, alignments: List[Alignment] = None, _trusted: bool = False) -> None:
+        """
+        Args:
+            alignments (:obj:`list` of Alignment): The initial list of alignments
+            _trusted (bool): If True the alignments are not type checked, this is meant to be used
+                only internally when the list is known to contain only Alignment objects
+        """
 
-    def __init__(self, alignments: List[Alignment] = []) -> None:
-        if any(not isinstance(a, Alignment) for a in alignments):
+        if alignments is None:
+            alignments = []
+
+        # The scan over the whole list is skipped when running with python -O
+        if __debug__ and not _trusted and any(not isinstance(a, Alignment) for a in alignments):
             raise TypeError("One or more of the objects is not an Alignment object.")
 
         self._alignments = alignments
+        # Column store of the alignment properties, built lazily by _column()
+        self._columns = {}
 
     def __iter__(self) -> Iterator[Alignment]:
         """This allows to iterate through this object"""
@@ -160,7 +266,23 @@ class Alignments(object):
     def sort(self, key: str, reverse: bool = False) -> None:
         """Used to sort inplace the alignment list"""
 
-        self._alignments.sort(key=attrgetter(key), reverse=reverse)
+        keys = self._column(key)
+        if keys.ndim != 1 or keys.dtype == object:
+            # Keys which are not scalars, as the indices, are compared as Python objects
+            alignments = self._alignments
+            order = sorted(
+                range(len(keys)), key=lambda i: getattr(alignments[i], key), reverse=reverse
+            )
+            order = np.array(order, dtype=np.intp)
+        elif reverse:
+            # Sorting the reversed keys keeps equal alignments in their original order
+            order = len(keys) - 1 - np.argsort(keys[::-1], kind="stable")[::-1]
+        else:
+            order = np.argsort(keys, kind="stable")
+
+        # The list is reordered in place, so the list the alignments were built from is sorted too
+        self._alignments[:] = [self._alignments[i] for i in order]
+        self._columns = {prop: column[order] for prop, column in self._columns.items()}
 
     def append(self, alignment: Alignment) -> None:
         """Used to add to the end of the list a new alignment"""
@@ -169,8 +291,24 @@ class Alignments(object):
             raise TypeError("One or more of the objects is not an Alignment object.")
 
         self._alignments.append(alignment)
+        self._columns.clear()
 
-    def _get_filter_option(self, kwarg: str) -> (str, str):
+    def _column(self, prop: str) -> np.ndarray:
+        """Returns the values of a property for all the alignments as an array.
+
+        The arrays are cached until the list of alignments changes, so that filtering is done
+        with vectorized comparisons instead of looping through the alignments.
+        """
+
+        column = self._columns.get(prop)
+        if column is None:
+            column = np.array([getattr(alignment, prop) for alignment in self._alignments])
+            self._columns[prop] = column
+
+        return column
+
+    @classmethod
+    def _get_filter_option(cls, kwarg: str) -> (str, str):
         """Given an argument provides the property and the operator to be used to filter.
 
         Args:
@@ -188,64 +326,72 @@ class Alignments(object):
         prop = kwarg_list[0]
         operator = kwarg_list[1] if len(kwarg_list) > 1 else None
 
-        if prop not in self.filter_props:
+        if prop not in cls.filter_props:
             raise TypeError(
-                f"{prop} is not a valid filter() properties. Valid properties are: {','.join(self.filter_props)}"
+                f"{prop} is not a valid filter() properties. Valid properties are: {','.join(cls.filter_props)}"
             )
 
-        if operator and operator not in self.filter_operators:
+        if operator and operator not in cls.filter_operators:
             raise TypeError(
-                f"{operator} is not a valid filter() operator. Valid operators are: {','.join(self.filter_operators)}"
+                f"{operator} is not a valid filter() operator. Valid operators are: {','.join(cls.filter_operators_map_alpha2symbol)}"
             )
 
         return prop, operator
 
-    def _compute_expression(self, alignment: Alignment, query: (str, str), value: Any) -> bool:
-        """This method computes the expression provided on the given alignment
+    @classmethod
+    def compile_filters(
+        cls, filters: Dict[str, Any]
+    ) -> List[Tuple[str, Callable[[Any, Any], Any], Any]]:
+        """Parses the filter() arguments once so that they can be applied to every alignment.
+
+        The functions of the operators also work element-wise on NumPy arrays of the property.
 
         Args:
-            alignment (:obj:`Alignment`): The alignemnt to be tested
-            query ((str, str)): A tuple of strings which respectively are the property and
-                the operator that need to be applied to the alignment
+            filters (:obj:`dict`): The arguments provided to filter() in the form property__operator=value
 
         Returns:
-            A boolean that indicates if the alignment is to be kept (True) or filtered (False)
+            A list of tuples containing the property, the function of the operator and the value
+            to compare with
         """
 
-        prop, operator = self._get_filter_option(query)
-
-        if not operator:
-            return getattr(alignment, prop) == value
-        elif operator == "neq":
-            return getattr(alignment, prop) != value
-        elif operator == "gt":
-            return getattr(alignment, prop) > value
-        elif operator == "gte":
-            return getattr(alignment, prop) >= value
-        elif operator == "lt":
-            return getattr(alignment, prop) < value
-        elif operator == "lte":
-            return getattr(alignment, prop) <= value
+        predicates = []
+        for key, value in filters.items():
+            prop, operator = cls._get_filter_option(key)
+            predicates.append((prop, _OPERATOR_FUNCTIONS[operator], value))
+
+        return predicates
 
     def filter(self, **kwargs: dict) -> "Alignments":
         """The actual method used to filter the alignments"""
 
-        filtered_alignments = []
-        for alignment in self._alignments:
-            is_alignment_wanted = True
-            for key, value in kwargs.items():
-                is_alignment_wanted = is_alignment_wanted and self._compute_expression(
-                    alignment, key, value
-                )
+        mask = np.ones(len(self._alignments), dtype=bool)
+        for prop, function, value in self.compile_filters(kwargs):
+            if not mask.any():
+                # Every alignment is already discarded, the remaining columns are not even built
+                break
+            mask &= function(self._column(prop), value)
+
+        return Alignments([self._alignments[i] for i in np.flatnonzero(mask)], _trusted=True)
 
-            if is_alignment_wanted:
-                filtered_alignments.append(alignment)
+    def ifilter(self, **kwargs: dict) -> Iterator[Alignment]:
+        """Lazily yields the alignments matching the filter, without building a new list.
+
+        This accepts the same arguments of filter() and is useful when only part of the result is
+        consumed (e.g. with next() or max()).
+        """
 
-        return Alignments(filtered_alignments)
+        # The arguments are parsed here so that invalid ones raise before iterating
+        predicates = self.compile_filters(kwargs)
+        return (
+            alignment
+            for alignment in self._alignments
+            if all(function(getattr(alignment, p), value) for p, function, value in predicates)
+        )
 
     def print(self, sort_param=None):
         """prints all the alignments
         """
-        for i, alignment in enumerate(self._alignments):
-            print(f"Alignments {i}:")
-            print(alignment.to_string(sort_param=sort_param))
+        sys.stdout.writelines(
+            f"Alignments {i}:\n{alignment.to_string(sort_param=sort_param)}\n"
+            for i, alignment in enumerate(self._alignments)
+        )
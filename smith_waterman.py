@@ -3,14 +3,21 @@ import os
 import re
 import sys
 from enum import Enum
-from itertools import chain
-from typing import List
+from functools import lru_cache
+from operator import ge, gt
+from typing import Callable, Iterable, List, Tuple, Union
 
-import pandas as pd
+import numpy as np
 from colorama import Fore, Style
 
 from alignment import Alignment, Alignments
 
+try:
+    from numba import get_num_threads, njit, prange
+except ImportError:
+    # Numba is optional, without it the scoring matrix is computed with NumPy only
+    njit = None
+
 
 class Move(Enum):
     """This enum represents the possible directions for the choices while computing the scoring matrix
@@ -22,53 +29,426 @@ class Move(Enum):
     NONE = "-"
 
 
-class Cell:
-    """This represents a cell of the scoring matrix
+# Integer codes of the moves as stored in the origin matrix, MOVES maps them back to the Move
+MOVE_NONE, MOVE_DIAGONAL, MOVE_HORIZONTAL, MOVE_VERTICAL = range(4)
+MOVES = (Move.NONE, Move.DIAGONAL, Move.HORIZONTAL, Move.VERTICAL)
+
+# The gap character as stored in the alignment buffers, and the runs of gaps in an alignment
+GAP = ord("-")
+GAPS_RE = re.compile(rb"-+")
+
+# The runs of horizontal and of vertical moves in the moves of a traceback, i.e. its gaps
+MOVE_GAPS_RE = re.compile(rb"\x02+|\x03+")
+
+# The properties computed by traceback_meta(), in the order of the tuple it returns
+META_PROPERTIES = ("length", "max_gap_length", "min_gap_length", "n_gaps", "score")
+
+
+# Minimum length of both sequences for the anti-diagonals to be split across threads
+PARALLEL_MIN_LENGTH = 2048
+# Minimum length of both sequences for the scoring matrix to be computed on the GPU with --device
+# cuda, the shorter ones are filled faster on the CPU than with a kernel launch per anti-diagonal
+CUDA_MIN_LENGTH = 5000
+# Size of the side of the square tiles the scoring matrix is split in when computed in parallel
+TILE_SIZE = 64
+# Number of rows computed together by the striped kernel, 16 int16 scores fill an AVX2 register
+LANES = 16
+# Maximum number of cells of a scoring matrix printed without --print-matrix
+PRINT_MATRIX_MAX_CELLS = 10_000
+
+
+def _update_cell(
+    score_matrix: np.ndarray,
+    origin_matrix: np.ndarray,
+    substitution_score: float,
+    i: int,
+    j: int,
+    gap_penalty: float,
+) -> None:
+    """Computes the score and the origin of the cell (i, j) of the scoring matrix, substitution_score
+    being the score of the match/mismatch of the characters of the cell"""
+
+    # Compute the scoring for match/mismatch and gaps
+    match = score_matrix[i - 1, j - 1] + substitution_score
+    h_gap = score_matrix[i, j - 1] + gap_penalty
+    v_gap = score_matrix[i - 1, j] + gap_penalty
+
+    # Ties are resolved in favour of the diagonal, then horizontal and vertical move.
+    # A negative score is reset to 0 and keeps the diagonal origin
+    best, origin = match, MOVE_DIAGONAL
+    if h_gap > best:
+        best, origin = h_gap, MOVE_HORIZONTAL
+    if v_gap > best:
+        best, origin = v_gap, MOVE_VERTICAL
+    if best < 0:
+        best, origin = 0, MOVE_DIAGONAL
+
+    # Store the result in the matrix
+    score_matrix[i, j] = best
+    origin_matrix[i, j] = origin
+
+
+def _fill_wavefront(
+    score_matrix: np.ndarray,
+    origin_matrix: np.ndarray,
+    substitution: np.ndarray,
+    gap_penalty: float,
+) -> None:
+    """Fills the scoring matrix by tiles of TILE_SIZE x TILE_SIZE cells, one anti-diagonal of tiles
+    at a time, splitting each anti-diagonal across threads.
+
+    A tile only depends on the tiles above, on the left and on the upper-left diagonal, so the tiles
+    of an anti-diagonal write disjoint cells and can be computed in parallel without any locking.
+    Each tile is filled in row-major order and is small enough to stay in the L1 cache.
+    """
+    n, m = score_matrix.shape
+    n_tiles_i = (n - 1 + TILE_SIZE - 1) // TILE_SIZE
+    n_tiles_j = (m - 1 + TILE_SIZE - 1) // TILE_SIZE
+
+    for d in range(n_tiles_i + n_tiles_j - 1):
+        for ti in prange(max(0, d - n_tiles_j + 1), min(n_tiles_i - 1, d) + 1):
+            tj = d - ti
+            i_start = 1 + ti * TILE_SIZE
+            j_start = 1 + tj * TILE_SIZE
+            for i in range(i_start, min(n, i_start + TILE_SIZE)):
+                for j in range(j_start, min(m, j_start + TILE_SIZE)):
+                    _update_cell(
+                        score_matrix, origin_matrix, substitution[i - 1, j - 1], i, j, gap_penalty
+                    )
 
-    Attributes:
-        score (float): the score of the pair
-        indices ((int, int)): the indices of the Cell
-        origin (Move): the direction for the traceback process
+
+@lru_cache(maxsize=None, typed=True)
+def _make_fill(match_score: float, mismatch_score: float, gap_penalty: float) -> Callable:
+    """Compiles a fill of the scoring matrix for the given scores, which become constants of the
+    compiled code. The compiled fills are cached in memory and on disk for each set of scores.
+    Args:
+        match_score (float): the score for the match
+        mismatch_score (float): the score for the mismatch
+        gap_penalty (float): the penalty fot the gap
+    Returns:
+        The function filling the scoring matrix for the character codes of the two sequences, cell by
+        cell in row-major order and skipping the cells farther than band from the main diagonal
     """
 
-    def __init__(self, score: float, indices: (int, int), origin: Move) -> None:
-        """
-        Args:
-            score (float): the score of the pair
-            indices ((int, int)): the indices of the Cell
-            origin (Move): the direction for the traceback process
-        """
+    def fill(
+        score_matrix: np.ndarray,
+        origin_matrix: np.ndarray,
+        a1: np.ndarray,
+        a2: np.ndarray,
+        band: int,
+    ) -> None:
+        n, m = score_matrix.shape
+
+        for i in range(1, n):
+            # A loop counting from 0 compiles to much faster code than range(j_start, j_end)
+            j_start = max(1, i - band)
+            for k in range(min(m, i + band + 1) - j_start):
+                j = j_start + k
+                substitution_score = match_score if a1[i - 1] == a2[j - 1] else mismatch_score
+                _update_cell(score_matrix, origin_matrix, substitution_score, i, j, gap_penalty)
 
-        self.score = score
-        self.indices = indices
-        self.origin = origin
+    return njit(cache=True, boundscheck=False)(fill)
 
-    def __str__(self) -> str:
-        return f"{self.origin.value} {self.score}"
 
-    # The following methods are used for comparing Cells by score
-    def __eq__(self, other: "Cell") -> bool:
-        return self.score == other.score
+def _best_cell(
+    a1: np.ndarray, a2: np.ndarray, match_score: float, mismatch_score: float, gap_penalty: float
+) -> (float, int, int):
+    """Computes the best score of the scoring matrix and the indices of its first cell in row-major
+    order, keeping only two rows of the matrix in memory.
+
+    The substitution scores are not precomputed here since that would take as much memory as the
+    whole scoring matrix.
+    """
+    n, m = len(a1) + 1, len(a2) + 1
+    previous = np.zeros(m, dtype=np.float64)
+    current = np.zeros(m, dtype=np.float64)
+    best_score, best_i, best_j = 0.0, 0, 0
+
+    for i in range(1, n):
+        for j in range(1, m):
+            match = previous[j - 1] + (match_score if a1[i - 1] == a2[j - 1] else mismatch_score)
+            score = max(match, current[j - 1] + gap_penalty, previous[j] + gap_penalty, 0.0)
+            current[j] = score
+            if score > best_score:
+                best_score, best_i, best_j = score, i, j
+        previous, current = current, previous
 
-    def __ne__(self, other: "Cell") -> bool:
-        return not self.__eq__
+    return best_score, best_i, best_j
 
-    def __lt__(self, other: "Cell") -> bool:
-        return self.score < other.score
 
-    def __le__(self, other: "Cell") -> bool:
-        return self.score <= other.score
+def _best_cell_striped(profile: np.ndarray, codes: np.ndarray, gap_penalty: int) -> (int, int, int):
+    """Computes the same cell as _best_cell() one column at a time, with the rows of a column split
+    in LANES interleaved stripes as in Farrar's striped Smith-Waterman.
+
+    Row k * n_segments + s is stored in lane k of segment s, so the cells of a segment do not depend
+    on each other and the loops over the lanes are compiled to SIMD instructions. The vertical gaps
+    crossing from a lane to the next one are propagated afterwards by the lazy F loop, which usually
+    stops after a few segments.
+    Args:
+        profile (np.ndarray): the striped scores of each character of seq2 against seq1, as
+            returned by _striped_profile()
+        codes (np.ndarray): the index in profile of each character of seq2
+        gap_penalty (int): the penalty for the gap, it must be negative
+    Returns:
+        A tuple containing the best score and the indices of its first cell in row-major order
+    """
+    n_segments = profile.shape[1]
+    zero = profile.dtype.type(0)
+    gap = profile.dtype.type(gap_penalty)
+    lowest = profile.dtype.type(np.iinfo(profile.dtype).min // 2)
+
+    previous = np.zeros((n_segments, LANES), dtype=profile.dtype)
+    current = np.zeros((n_segments, LANES), dtype=profile.dtype)
+    h = np.empty(LANES, dtype=profile.dtype)
+    f = np.empty(LANES, dtype=profile.dtype)
+    best_score, best_i, best_j = 0, 0, 0
+    if n_segments == 0:
+        return best_score, best_i, best_j
+
+    for j in range(len(codes)):
+        scores = profile[codes[j]]
+
+        # The diagonal of the first segment is the last segment of the previous column, shifted by
+        # one lane since the rows of lane k follow the ones of lane k - 1
+        h[0] = zero
+        for k in range(1, LANES):
+            h[k] = previous[n_segments - 1, k - 1]
+        f[:] = lowest
+
+        for s in range(n_segments):
+            for k in range(LANES):
+                score = h[k] + scores[s, k]
+                h_gap = previous[s, k] + gap
+                if h_gap > score:
+                    score = h_gap
+                if f[k] > score:
+                    score = f[k]
+                if score < zero:
+                    score = zero
+                h[k] = previous[s, k]
+                current[s, k] = score
+                f[k] = score + gap
+
+        # Lazy F loop, a vertical gap stops being propagated as soon as it improves no cell and it
+        # crosses at most LANES - 1 lanes. The gaps are clamped to lowest to not wrap around
+        done = False
+        for _ in range(LANES - 1):
+            for k in range(LANES - 1, 0, -1):
+                f[k] = f[k - 1]
+            f[0] = lowest
+            for s in range(n_segments):
+                improved = False
+                for k in range(LANES):
+                    if f[k] > current[s, k]:
+                        improved = True
+                if not improved:
+                    done = True
+                    break
+                for k in range(LANES):
+                    if f[k] > current[s, k]:
+                        current[s, k] = f[k]
+                    f[k] = max(f[k] + gap, lowest)
+            if done:
+                break
+
+        # Only the columns reaching the best score are scanned for the first row holding it
+        column_best = current.max()
+        if column_best > 0 and column_best >= best_score:
+            found = False
+            for k in range(LANES):
+                for s in range(n_segments):
+                    if current[s, k] == column_best:
+                        i = k * n_segments + s + 1
+                        if column_best > best_score or i < best_i:
+                            best_score, best_i, best_j = column_best, i, j + 1
+                        found = True
+                        break
+                if found:
+                    break
+
+        previous, current = current, previous
+
+    return best_score, best_i, best_j
+
+
+if njit is not None:
+    _update_cell = njit(inline="always")(_update_cell)
+    _best_cell = njit(cache=True, boundscheck=False)(_best_cell)
+    _best_cell_striped = njit(cache=True, boundscheck=False)(_best_cell_striped)
+    _fill_wavefront = njit(cache=True, boundscheck=False, parallel=True)(_fill_wavefront)
+
+
+def _fill_antidiagonals(
+    score_matrix: np.ndarray,
+    origin_matrix: np.ndarray,
+    substitution: np.ndarray,
+    gap_penalty: float,
+    band: int,
+) -> None:
+    """Fills the scoring matrix with NumPy operations, used when Numba is not available"""
+    n, m = score_matrix.shape
+    scores = score_matrix.ravel()
+    origins = origin_matrix.ravel()
+    substitutions = substitution.ravel()
+
+    # Cells on the same anti-diagonal (i + j == d) only depend on the two previous anti-diagonals,
+    # so each anti-diagonal is computed at once with vectorized operations
+    for d in range(2, n + m - 1):
+        # |i - j| <= band for the cells in the band, with j = d - i
+        i = np.arange(
+            max(1, d - m + 1, (d - band + 1) // 2), min(n - 1, d - 1, (d + band) // 2) + 1
+        )
+
+        # Flat indices of the cells and of their neighbours, computed once for all the reads
+        cells = i * (m - 1) + d
+        left = cells - 1
+        up = cells - m
+
+        # Compute the scoring for match/mismatch and gaps
+        match = scores[up - 1] + substitutions[(i - 1) * (m - 2) + d - 2]
+        h_gap = scores[left] + gap_penalty
+        v_gap = scores[up] + gap_penalty
+
+        # Same tie-breaking as _update_cell()
+        origin = np.where(h_gap > match, MOVE_HORIZONTAL, MOVE_DIAGONAL)
+        best = np.maximum(match, h_gap)
+        origin = np.where(v_gap > best, MOVE_VERTICAL, origin)
+        best = np.maximum(best, v_gap)
+        origin = np.where(best < 0, MOVE_DIAGONAL, origin)
+
+        # Store the result in the matrix
+        scores[cells] = np.maximum(best, 0)
+        origins[cells] = origin
+
+
+def _best_cell_antidiagonals(
+    a1: np.ndarray,
+    a2: np.ndarray,
+    match_score: float,
+    mismatch_score: float,
+    gap_penalty: float,
+    dtype: np.dtype,
+) -> (float, int, int):
+    """Computes the same cell as _best_cell() with NumPy operations, one anti-diagonal at a time,
+    used when Numba is not available.
+
+    Only the last three anti-diagonals are kept in memory, each one indexed by the row of its cells:
+    the cell (i, j) reads (i - 1, j - 1) at i - 1 of the anti-diagonal two steps before, (i, j - 1)
+    and (i - 1, j) at i and i - 1 of the previous one. The entries of the cells in the first row and
+    column are never written, so they stay 0.
+    """
+    n, m = len(a1), len(a2)
+    previous2 = np.zeros(n + 1, dtype=dtype)
+    previous = np.zeros(n + 1, dtype=dtype)
+    current = np.zeros(n + 1, dtype=dtype)
+    match_score, mismatch_score = dtype.type(match_score), dtype.type(mismatch_score)
+    gap_penalty = dtype.type(gap_penalty)
+    # The characters of seq2 on an anti-diagonal are a slice of the reversed seq2
+    reversed_a2 = a2[::-1]
+    best_score, best_i, best_j = 0, 0, 0
+
+    for d in range(2, n + m + 1):
+        low, high = max(1, d - m), min(n, d - 1)
+        if low > high:
+            continue
 
-    def __gt__(self, other: "Cell") -> bool:
-        return self.score > other.score
+        chars1 = a1[low - 1 : high]
+        chars2 = reversed_a2[m - d + low : m - d + high + 1]
+        match = previous2[low - 1 : high] + np.where(chars1 == chars2, match_score, mismatch_score)
+        h_gap = previous[low : high + 1] + gap_penalty
+        v_gap = previous[low - 1 : high] + gap_penalty
+        scores = np.maximum(np.maximum(match, h_gap), np.maximum(v_gap, 0))
+        current[low : high + 1] = scores
 
-    def __ge__(self, other: "Cell") -> bool:
-        return self.score >= other.score
+        # argmax gives the first row reaching the maximum, the first cell of the anti-diagonal in
+        # row-major order
+        k = int(scores.argmax())
+        score = scores[k]
+        i = low + k
+        if score > best_score or (score == best_score and score > 0 and i < best_i):
+            best_score, best_i, best_j = score, i, d - i
+
+        previous2, previous, current = previous, current, previous2
+
+    return best_score, best_i, best_j
+
+
+def score_dtypes(
+    match_score: float, mismatch_score: float, gap_penalty: float, max_length: int
+) -> (np.dtype, np.dtype):
+    """Chooses the smallest types able to hold exactly the scores of a scoring matrix.
+
+    Integer scores are stored in int16 (or int32) arrays, which move a fraction of the bytes of
+    float64 arrays. Fractional scores keep using float64.
+    Args:
+        match_score (float): the score for the match
+        mismatch_score (float): the score for the mismatch
+        gap_penalty (float): the penalty fot the gap
+        max_length (int): the maximum length of an alignment, i.e. the sum of the sequence lengths
+    Returns:
+        A tuple containing the type for the scoring matrix and the one for the substitution scores
+    """
+    scores = (match_score, mismatch_score, gap_penalty)
+    if not all(float(score).is_integer() for score in scores):
+        return np.dtype(np.float64), np.dtype(np.float64)
+
+    # No cell can be higher than the best step taken at every move, or lower than a single step
+    # from a zero cell before the negative values are reset to 0
+    highest = max(max(scores), 0) * max_length
+    lowest = min(min(scores), 0)
+    for dtype in (np.int16, np.int32):
+        if lowest >= np.iinfo(dtype).min and highest <= np.iinfo(dtype).max:
+            int8 = np.iinfo(np.int8)
+            fits_int8 = all(int8.min <= score <= int8.max for score in scores)
+            return np.dtype(dtype), np.dtype(np.int8 if fits_int8 else dtype)
+
+    return np.dtype(np.float64), np.dtype(np.float64)
+
+
+def _striped_profile(
+    a1: np.ndarray, match_score: int, mismatch_score: int, dtype: np.dtype
+) -> (np.ndarray, np.ndarray):
+    """Computes the query profile of seq1 for _best_cell_striped(), which only depends on seq1 and
+    can be reused for any seq2
+    Args:
+        a1 (np.ndarray): the character codes of the first sequence
+        match_score (int): the score for the match
+        mismatch_score (int): the score for the mismatch
+        dtype (np.dtype): the integer type of the scores
+    Returns:
+        A tuple containing the scores of each character of seq1, and of any other character, against
+        the rows of seq1 in striped order, with shape (characters, segments, LANES), and the table
+        mapping each character code to its index in the profile
+    """
+    n_segments = (len(a1) + LANES - 1) // LANES
+
+    # Row k * n_segments + s goes to lane k of segment s, the rows after seq1 are padding
+    rows = np.full(n_segments * LANES, -1, dtype=np.int16)
+    rows[: len(a1)] = a1
+    rows = rows.reshape(LANES, n_segments).T
+
+    # The characters missing from seq1 always mismatch, so they share the last row of the profile
+    alphabet = np.unique(a1)
+    index = np.full(256, len(alphabet), dtype=np.intp)
+    index[alphabet] = np.arange(len(alphabet))
+
+    profile = np.full((len(alphabet) + 1,) + rows.shape, mismatch_score, dtype=dtype)
+    profile[:-1][rows == alphabet[:, np.newaxis, np.newaxis]] = match_score
+    # The padding rows score low enough to never start an alignment
+    profile[:, rows < 0] = np.iinfo(dtype).min // 2
+
+    return profile, index
 
 
 def compute_scoring_matrix(
-    seq1: str, seq2: str, match_score: float, mismatch_score: float, gap_penalty: float
-) -> List[List[Cell]]:
+    seq1: str,
+    seq2: str,
+    match_score: float,
+    mismatch_score: float,
+    gap_penalty: float,
+    float_scores: bool = False,
+    band: int = None,
+) -> (np.ndarray, np.ndarray):
     """This method is used to compute the scoring matrix for
     Args:
         seq1 (str): the first sequence
@@ -76,159 +456,477 @@ def compute_scoring_matrix(
         match_score (float): the score for the match
         mismatch_score (float): the score for the mismatch
         gap_penalty (float): the penalty fot the gap
+        float_scores (bool): if True the scores are stored as float64 even when they are integers
+        band (int): if given only the cells (i, j) with |i - j| <= band are computed and the others
+            are left to 0, so alignments leaving the band are cut or missed. It is ignored when a
+            sequence is more than twice as long as the other one
     Returns:
-        the matrix containing cell content
+        A tuple containing the matrix of the scores and the matrix of the origins of each cell,
+        the latter holding the MOVE_* codes for the traceback process
     """
+    if band is not None and band < 0:
+        raise ValueError(f"The band must not be negative, got {band}")
+
     n = len(seq1) + 1
     m = len(seq2) + 1
 
-    # Initialize the scoring matrix
-    scoring_matrix = [[Cell(0, (i, j), Move.NONE) for j in range(m)] for i in range(n)]
+    if float_scores:
+        dtype = substitution_dtype = np.dtype(np.float64)
+    else:
+        dtype, substitution_dtype = score_dtypes(
+            match_score, mismatch_score, gap_penalty, len(seq1) + len(seq2)
+        )
 
-    for i in range(1, n):
-        for j in range(1, m):
-            seq_i = seq1[i - 1]
-            seq_j = seq2[j - 1]
-
-            # Compute the scoring for match/mismatch and gaps
-            match = Cell(
-                scoring_matrix[i - 1][j - 1].score
-                + (match_score if seq_i == seq_j else mismatch_score),
-                (i, j),
-                Move.DIAGONAL,
+    # Initialize the scoring matrix, the first row and column are never updated
+    score_matrix = np.zeros((n, m), dtype=dtype)
+    origin_matrix = np.full((n, m), MOVE_NONE, dtype=np.uint8)
+
+    a1 = np.frombuffer(seq1.encode("ascii"), dtype=np.uint8)
+    a2 = np.frombuffer(seq2.encode("ascii"), dtype=np.uint8)
+
+    # The band is around the main diagonal, which the alignments of sequences with very different
+    # lengths mostly leave
+    if band is not None and not len(seq2) / 2 <= len(seq1) <= 2 * len(seq2):
+        band = None
+
+    # Without a band every cell is within max(n, m) from the main diagonal
+    banded = band is not None
+    if not banded:
+        band = max(n, m)
+
+    if njit is not None and (banded or get_num_threads() == 1 or min(n, m) <= PARALLEL_MIN_LENGTH):
+        # The scores are compiled in the row-major fill, which compares the characters directly
+        fill = _make_fill(
+            dtype.type(match_score), dtype.type(mismatch_score), dtype.type(gap_penalty)
+        )
+        fill(score_matrix, origin_matrix, a1, a2, band)
+        return score_matrix, origin_matrix
+
+    # Score of every pair of characters for the match/mismatch move, computed once for all the cells
+    substitution = np.where(
+        np.equal.outer(a1, a2),
+        substitution_dtype.type(match_score),
+        substitution_dtype.type(mismatch_score),
+    )
+
+    gap_penalty = dtype.type(gap_penalty)
+    if njit is None:
+        _fill_antidiagonals(score_matrix, origin_matrix, substitution, gap_penalty, band)
+    else:
+        _fill_wavefront(score_matrix, origin_matrix, substitution, gap_penalty)
+
+    return score_matrix, origin_matrix
+
+
+def compute_best_alignment(
+    seq1: str,
+    seq2: str,
+    match_score: float,
+    mismatch_score: float,
+    gap_penalty: float,
+    float_scores: bool = False,
+) -> Alignment:
+    """This method computes only the best alignment, without keeping the whole scoring matrix
+    Args:
+        seq1 (str): the first sequence
+        seq2 (str): the second sequence
+        match_score (float): the score for the match
+        mismatch_score (float): the score for the mismatch
+        gap_penalty (float): the penalty fot the gap
+        float_scores (bool): if True the scores are stored as float64 even when they are integers
+    Returns:
+        The alignment starting from the cell with the best score
+    """
+    (alignment,) = align_many(seq1, [seq2], match_score, mismatch_score, gap_penalty, float_scores)
+    return alignment
+
+
+def align_many(
+    seq1: str,
+    seqs: Iterable[str],
+    match_score: float,
+    mismatch_score: float,
+    gap_penalty: float,
+    float_scores: bool = False,
+) -> Alignments:
+    """This method computes the best alignment of the first sequence with each of the given ones,
+    computing the query profile of the first sequence only once
+    Args:
+        seq1 (str): the first sequence
+        seqs (:obj:`iterable` of str): the sequences to align with the first one
+        match_score (float): the score for the match
+        mismatch_score (float): the score for the mismatch
+        gap_penalty (float): the penalty fot the gap
+        float_scores (bool): if True the scores are stored as float64 even when they are integers
+    Returns:
+        The best alignment with each sequence, in the same order as seqs
+    """
+    seqs = list(seqs)
+    alignments = Alignments()
+
+    a1 = np.frombuffer(seq1.encode("ascii"), dtype=np.uint8)
+    max_length = len(seq1) + max(map(len, seqs), default=0)
+    dtype, _ = score_dtypes(match_score, mismatch_score, gap_penalty, max_length)
+    if float_scores:
+        dtype = np.dtype(np.float64)
+    striped = njit is not None and dtype.kind == "i" and np.iinfo(dtype).min // 2 < gap_penalty < 0
+    if striped:
+        profile, index = _striped_profile(a1, match_score, mismatch_score, dtype)
+
+    for seq2 in seqs:
+        a2 = np.frombuffer(seq2.encode("ascii"), dtype=np.uint8)
+        if njit is None:
+            _, best_i, best_j = _best_cell_antidiagonals(
+                a1, a2, match_score, mismatch_score, gap_penalty, dtype
+            )
+        elif striped:
+            _, best_i, best_j = _best_cell_striped(profile, index[a2], gap_penalty)
+        else:
+            _, best_i, best_j = _best_cell(
+                a1, a2, float(match_score), float(mismatch_score), float(gap_penalty)
             )
-            h_gap = Cell(scoring_matrix[i][j - 1].score + gap_penalty, (i, j), Move.HORIZONTAL)
-            v_gap = Cell(scoring_matrix[i - 1][j].score + gap_penalty, (i, j), Move.VERTICAL)
 
-            # Store the result in the matrix
-            scoring_matrix[i][j] = max(match, h_gap, v_gap, Cell(0, (i, j), Move.DIAGONAL))
+        # The traceback only visits cells above and on the left of the best one, and the scoring
+        # matrix of the prefixes is exactly that region, so it is the only part computed again
+        score_matrix, origin_matrix = compute_scoring_matrix(
+            seq1[:best_i], seq2[:best_j], match_score, mismatch_score, gap_penalty, float_scores
+        )
+        alignments.append(
+            traceback_process(score_matrix, origin_matrix, seq1, seq2, (best_i, best_j))
+        )
+
+    return alignments
+
+
+def _init_worker(
+    match_score: float, mismatch_score: float, gap_penalty: float, float_scores: bool
+) -> None:
+    """Loads the compiled kernels in a worker process of align_pairs() before it gets any pair. The
+    kernels depend on the scores, so the ones of the pairs are used"""
+    compute_best_alignment("ACGT", "ACGT", match_score, mismatch_score, gap_penalty, float_scores)
 
-    return scoring_matrix
+
+def _align_pair(args: tuple) -> Alignment:
+    """Computes the best alignment of a pair in a worker process of align_pairs()"""
+    return compute_best_alignment(*args)
+
+
+def align_pairs(
+    pairs: Iterable[Tuple[str, str]],
+    match_score: float,
+    mismatch_score: float,
+    gap_penalty: float,
+    float_scores: bool = False,
+    processes: int = None,
+) -> Alignments:
+    """This method computes the best alignment of each pair of sequences, distributing the pairs
+    across processes
+    Args:
+        pairs (:obj:`iterable` of (str, str)): the pairs of sequences to align
+        match_score (float): the score for the match
+        mismatch_score (float): the score for the mismatch
+        gap_penalty (float): the penalty fot the gap
+        float_scores (bool): if True the scores are stored as float64 even when they are integers
+        processes (int): the number of processes, by default the number of CPUs
+    Returns:
+        The best alignment of each pair, in the same order as pairs
+    """
+    tasks = [
+        (seq1, seq2, match_score, mismatch_score, gap_penalty, float_scores) for seq1, seq2 in pairs
+    ]
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(tasks) < 2:
+        return Alignments([_align_pair(task) for task in tasks], _trusted=True)
+
+    # Imported here since multiprocessing is only needed for the pairs, not by the command line
+    from multiprocessing import Pool
+
+    # A few chunks per process balance the load without sending the pairs one at a time
+    chunksize = max(1, len(tasks) // (processes * 4))
+    with Pool(
+        processes,
+        initializer=_init_worker,
+        initargs=(match_score, mismatch_score, gap_penalty, float_scores),
+    ) as pool:
+        return Alignments(pool.map(_align_pair, tasks, chunksize), _trusted=True)
 
 
 def traceback_process(
-    scoring_matrix: List[List[Cell]], seq1: str, seq2: str, starting_cell: Cell
+    score_matrix: np.ndarray,
+    origin_matrix: np.ndarray,
+    seq1: Union[str, bytes],
+    seq2: Union[str, bytes],
+    start: (int, int),
 ) -> Alignment:
     """This method computes the traceback process for retrieving an alignment
     Args:
-        scoring_matrix (List[List[Cell]]): the scoring matrix
-        seq1 (str): the first sequence
-        seq2 (str): the second sequence
-        starting_cell (Cell): the starting cell for the traceback process
+        score_matrix (np.ndarray): the matrix of the scores
+        origin_matrix (np.ndarray): the matrix of the origins of each cell
+        seq1 (str or bytes): the first sequence
+        seq2 (str or bytes): the second sequence
+        start ((int, int)): the indices of the starting cell for the traceback process
     Returns:
-        The alignment starting from starting_cell
+        The alignment starting from start
     """
-    subseq1, subseq2 = "", ""
-    max_gap_length = 0
-    min_gap_length = max(len(seq1), len(seq2))
-    n_gaps = 0
-    tmp_gap = None
-    gap_direction = None
-    actual_cell = starting_cell
-
-    while actual_cell.score > 0:
-        i, j = actual_cell.indices
-        seq_i = seq1[i - 1]
-        seq_j = seq2[j - 1]
-
-        if actual_cell.origin == Move.DIAGONAL:
-            if tmp_gap is not None:
-                # If there was a gap end it and update counts
-                max_gap_length = max(max_gap_length, tmp_gap)
-                min_gap_length = min(min_gap_length, tmp_gap)
-                n_gaps += 1
-                tmp_gap = None
-                gap_direction = None
-
-            subseq1 += seq_i
-            subseq2 += seq_j
-            actual_cell = scoring_matrix[i - 1][j - 1]
-        elif actual_cell.origin == Move.HORIZONTAL:
-            if gap_direction == Move.HORIZONTAL:
-                tmp_gap += 1
-            else:
-                if tmp_gap is not None:
-                    max_gap_length = max(max_gap_length, tmp_gap)
-                    min_gap_length = min(min_gap_length, tmp_gap)
-                    n_gaps += 1
-                tmp_gap = 1
-                gap_direction = Move.HORIZONTAL
-
-            subseq1 += "-"
-            subseq2 += seq_j
-            actual_cell = scoring_matrix[i][j - 1]
-        elif actual_cell.origin == Move.VERTICAL:
-            if gap_direction == Move.VERTICAL:
-                tmp_gap += 1
-            else:
-                if tmp_gap is not None:
-                    max_gap_length = max(max_gap_length, tmp_gap)
-                    min_gap_length = min(min_gap_length, tmp_gap)
-                    n_gaps += 1
-                tmp_gap = 1
-                gap_direction = Move.VERTICAL
-
-            subseq1 += seq_i
-            subseq2 += "-"
-            actual_cell = scoring_matrix[i - 1][j]
+    if isinstance(seq1, str):
+        seq1 = seq1.encode("ascii")
+    if isinstance(seq2, str):
+        seq2 = seq2.encode("ascii")
+
+    moves = traceback_moves(score_matrix, origin_matrix, start)
+    return _build_alignment(
+        np.frombuffer(seq1, dtype=np.uint8),
+        np.frombuffer(seq2, dtype=np.uint8),
+        moves,
+        _path(moves, start),
+        traceback_meta(score_matrix, moves, start, max(len(seq1), len(seq2))),
+        start,
+    )
+
+
+def traceback_moves(
+    score_matrix: np.ndarray, origin_matrix: np.ndarray, start: (int, int)
+) -> bytes:
+    """This method walks the traceback process without building the subsequences of the alignment
+    Args:
+        score_matrix (np.ndarray): the matrix of the scores
+        origin_matrix (np.ndarray): the matrix of the origins of each cell
+        start ((int, int)): the indices of the starting cell for the traceback process
+    Returns:
+        The origins of the cells on the path, in the order of the alignment
+    """
+    i, j = start
+
+    if njit is not None:
+        moves = np.empty(i + j, dtype=np.uint8)
+        k = _walk_moves(score_matrix, origin_matrix, i, j, moves)
+        if k < 0:
+            raise Exception(
+                f'Something went wrong origin must be one of {",".join(m.name for m in MOVES[1:])}'
+            )
+        return moves[k:].tobytes()
+
+    # Every move decreases i + j, so this bounds the length of the alignment. The buffer is filled
+    # from the end since the traceback visits the alignment backwards
+    k = i + j
+    moves = bytearray(k)
+
+    # Bound methods reading plain Python scalars, cheaper than indexing the arrays at every move
+    score_at = score_matrix.item
+    origin_at = origin_matrix.item
+
+    while score_at(i, j) > 0:
+        origin = origin_at(i, j)
+        k -= 1
+        moves[k] = origin
+
+        if origin == MOVE_DIAGONAL:
+            i, j = i - 1, j - 1
+        elif origin == MOVE_HORIZONTAL:
+            j -= 1
+        elif origin == MOVE_VERTICAL:
+            i -= 1
         else:
             raise Exception(
-                f'Something went wrong origin must be one of {",".join([move for move in Move])}'
+                f'Something went wrong origin must be one of {",".join(m.name for m in MOVES[1:])}'
             )
 
-    if tmp_gap is not None:
-        max_gap_length = max(max_gap_length, tmp_gap)
-        min_gap_length = min(min_gap_length, tmp_gap)
-        n_gaps += 1
-
-    return Alignment(
-        subseq1[::-1],
-        subseq2[::-1],
-        max_gap_length,
-        min_gap_length,
-        n_gaps,
-        starting_cell.score,
-        starting_cell.indices,
+    return bytes(moves[k:])
+
+
+def _walk_moves(
+    score_matrix: np.ndarray, origin_matrix: np.ndarray, i: int, j: int, moves: np.ndarray
+) -> int:
+    """Compiled traceback_moves(), fills moves from the end and returns the index of the first move,
+    or -1 if the path reaches a cell without origin"""
+    k = i + j
+    while score_matrix[i, j] > 0:
+        origin = origin_matrix[i, j]
+        k -= 1
+        moves[k] = origin
+
+        if origin == MOVE_DIAGONAL:
+            i -= 1
+            j -= 1
+        elif origin == MOVE_HORIZONTAL:
+            j -= 1
+        elif origin == MOVE_VERTICAL:
+            i -= 1
+        else:
+            return -1
+
+    return k
+
+
+if njit is not None:
+    _walk_moves = njit(cache=True, boundscheck=False)(_walk_moves)
+
+
+def traceback_meta(
+    score_matrix: np.ndarray, moves: bytes, start: (int, int), max_length: int
+) -> Tuple[int, int, int, int, float]:
+    """This method computes the properties of an alignment from the moves of its traceback
+    Args:
+        score_matrix (np.ndarray): the matrix of the scores
+        moves (bytes): the moves of the traceback, as returned by traceback_moves()
+        start ((int, int)): the indices of the starting cell for the traceback process
+        max_length (int): the length of the longest sequence, the min_gap_length without gaps
+    Returns:
+        The length, max_gap_length, min_gap_length, n_gaps and score of the alignment
+    """
+    gaps = [len(gap) for gap in MOVE_GAPS_RE.findall(moves)]
+
+    return (
+        len(moves),
+        max(gaps, default=0),
+        min(gaps, default=max_length),
+        len(gaps),
+        float(score_matrix[start]),
     )
 
 
-def printable_matrix(matrix: List[list], seq1: str, seq2: str) -> str:
+def _path(moves: bytes, start: (int, int)) -> Tuple[np.ndarray, np.ndarray]:
+    """Computes the rows and the columns of the cells on the path of the traceback"""
+    steps = np.frombuffer(moves, dtype=np.uint8)
+
+    # Every move but the horizontal ones consumes a character of seq1, every move but the vertical
+    # ones a character of seq2
+    rows = np.cumsum(steps != MOVE_HORIZONTAL)
+    columns = np.cumsum(steps != MOVE_VERTICAL)
+    if len(moves):
+        rows += start[0] - rows[-1]
+        columns += start[1] - columns[-1]
+
+    return rows, columns
+
+
+def _build_alignment(
+    seq1: np.ndarray,
+    seq2: np.ndarray,
+    moves: bytes,
+    path: Tuple[np.ndarray, np.ndarray],
+    meta: Tuple[int, int, int, int, float],
+    start: (int, int),
+) -> Alignment:
+    """Builds the alignment from the moves of its traceback, its path and its properties"""
+    steps = np.frombuffer(moves, dtype=np.uint8)
+    rows, columns = path
+
+    # The character of a move is the one of the row, or column, of the cell it leaves
+    subseq1 = np.where(steps != MOVE_HORIZONTAL, seq1[rows - 1], GAP).astype(np.uint8)
+    subseq2 = np.where(steps != MOVE_VERTICAL, seq2[columns - 1], GAP).astype(np.uint8)
+
+    return Alignment(subseq1.tobytes(), subseq2.tobytes(), *meta[1:], start)
+
+
+def gap_lengths(subseq1: bytes, subseq2: bytes) -> List[int]:
+    """This method computes the lengths of the gaps of an alignment
+    Args:
+        subseq1 (bytes): the first subsequence of the alignment
+        subseq2 (bytes): the second subsequence of the alignment
+    Returns:
+        The length of each gap, a gap being a run of horizontal moves, i.e. of "-" in the first
+        subsequence, or of vertical moves, i.e. of "-" in the second subsequence
+    """
+    return [len(gap) for subseq in (subseq1, subseq2) for gap in GAPS_RE.findall(subseq)]
+
+
+def printable_matrix(
+    score_matrix: np.ndarray, origin_matrix: np.ndarray, seq1: str, seq2: str
+) -> str:
     """This prints the matrix in a readable format
     Args:
-        matrix (List[list]): the matrix to be printed
+        score_matrix (np.ndarray): the matrix of the scores
+        origin_matrix (np.ndarray): the matrix of the origins of each cell
         seq1 (str):
         seq2 (str):
     Returns:
         The printable string
     """
-    df = pd.DataFrame(
-        matrix,
-        index=[(i, c) for i, c in enumerate(" " + seq1)],
-        columns=[(i, c) for i, c in enumerate(" " + seq2)],
-    )
+    arrows = [move.value for move in MOVES]
+    index = [f"({i}, {c})" for i, c in enumerate(" " + seq1)]
+    columns = [f"({j}, {c})" for j, c in enumerate(" " + seq2)]
+    cells = [
+        [f"{arrows[origin]} {float(score)}" for score, origin in zip(scores, origins)]
+        for scores, origins in zip(score_matrix.tolist(), origin_matrix.tolist())
+    ]
 
-    return str(df) + "\n\n"
+    # Every column is right aligned to its widest value plus a leading space, while the index column
+    # is left aligned
+    index_width = max(map(len, index))
+    widths = [
+        max(len(column), max(len(row[j]) + 1 for row in cells)) for j, column in enumerate(columns)
+    ]
 
+    lines = [" " * index_width + "".join(f" {c:>{w}}" for c, w in zip(columns, widths))]
+    for label, row in zip(index, cells):
+        lines.append(f"{label:<{index_width}}" + "".join(f" {c:>{w}}" for c, w in zip(row, widths)))
 
-def find_alignments_by_score(scoring_matrix: List[List[Cell]], seq1: str, seq2: str) -> Alignments:
+    return "\n".join(lines) + "\n\n"
+
+
+def find_alignments_by_score(
+    score_matrix: np.ndarray, origin_matrix: np.ndarray, seq1: str, seq2: str, **filters: dict
+) -> Alignments:
     """This method computes all the alignments for a given scoring matrix
     Args:
-        scoring_matrix (List[List[Cell]]): the scoring matrix
+        score_matrix (np.ndarray): the matrix of the scores
+        origin_matrix (np.ndarray): the matrix of the origins of each cell
         seq1 (str): the first sequence
         seq2 (str): the second sequence
+        filters (dict): the filters the alignments must satisfy, as accepted by Alignments.filter()
     Returns:
-        All the alignments from the scoring matrix without overlap
+        All the alignments from the scoring matrix without overlap, by decreasing score
     """
-    alignments = Alignments()
-    n, m = len(seq1) + 1, len(seq2) + 1
+    predicates = Alignments.compile_filters(filters)
 
-    for i in range(1, n):
-        for j in range(1, m):
-            cell = scoring_matrix[i][j]
-            if cell.score > 0:
-                alignments.append(traceback_process(scoring_matrix, seq1, seq2, cell))
+    # The score of an alignment is the one of its starting cell. The alignments are traced by
+    # decreasing score, so a lower bound on the score discards cells which would only be traced
+    # after all the others: they are never traced, without changing the cells visited before
+    starts = score_matrix > 0
+    for prop, function, value in predicates:
+        if prop == "score" and function in (gt, ge):
+            starts &= function(score_matrix, value)
 
-    return alignments
+    # The other filters on the properties known before building the subsequences are applied to
+    # the moves of each traceback, the remaining ones to the alignments built
+    meta_predicates = [
+        (META_PROPERTIES.index(prop), function, value)
+        for prop, function, value in predicates
+        if prop in META_PROPERTIES and not (prop == "score" and function in (gt, ge))
+    ]
+    other_filters = {
+        key: value
+        for key, value in filters.items()
+        if Alignments._get_filter_option(key)[0] not in META_PROPERTIES
+    }
+
+    alignments = []
+    seq1 = np.frombuffer(seq1.encode("ascii"), dtype=np.uint8)
+    seq2 = np.frombuffer(seq2.encode("ascii"), dtype=np.uint8)
+
+    # The alignments are traced from the best score down, ties in row-major order. The traceback
+    # from a cell on the path of a previous alignment is part of it, so those cells are skipped
+    order = np.argsort(-score_matrix[starts], kind="stable")
+    visited = np.zeros(score_matrix.shape, dtype=bool)
+
+    # tolist() turns the indices into plain ints
+    for start in np.argwhere(starts)[order].tolist():
+        start = tuple(start)
+        if visited[start]:
+            continue
+        moves = traceback_moves(score_matrix, origin_matrix, start)
+        path = _path(moves, start)
+        visited[path] = True
+
+        # Only the alignments passing the filters have their subsequences built
+        meta = traceback_meta(score_matrix, moves, start, max(len(seq1), len(seq2)))
+        if all(function(meta[index], value) for index, function, value in meta_predicates):
+            alignments.append(_build_alignment(seq1, seq2, moves, path, meta, start))
+
+    # The list only holds Alignment objects, so it is wrapped without checking it again
+    alignments = Alignments(alignments, _trusted=True)
+    return alignments.filter(**other_filters) if other_filters else alignments
 
 
 if __name__ == "__main__":
@@ -266,6 +964,45 @@ if __name__ == "__main__":
     )
 
     parser.add_argument("--output-file", "-o", type=str, help="Specify file to save the output")
+    parser.add_argument(
+        "--best-only",
+        action="store_true",
+        help="If this is specified only the best alignment is computed, without keeping the whole "
+        "scoring matrix in memory. The matrix is not printed and filters and sorting are ignored",
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="If this is specified the best alignment is computed with parasail, if it is installed "
+        "and the scores are integers. It implies --best-only",
+    )
+    parser.add_argument(
+        "--float-scores",
+        action="store_true",
+        help="If this is specified the scores are stored as floats even when they are integers",
+    )
+    parser.add_argument(
+        "--print-matrix",
+        action="store_true",
+        help="If this is specified the scoring matrix is printed even when it has more than "
+        f"{PRINT_MATRIX_MAX_CELLS} cells",
+    )
+    parser.add_argument(
+        "--band",
+        type=int,
+        help="If this is specified only the cells at most BAND cells away from the main diagonal "
+        "are computed, which is much faster but misses the alignments leaving the band. It is "
+        "ignored if a sequence is more than twice as long as the other one and with --best-only",
+    )
+    parser.add_argument(
+        "--device",
+        type=str,
+        choices=["cpu", "cuda"],
+        default="cpu",
+        help="The device computing the scoring matrix. The GPU is used through numba.cuda, and "
+        f"only when both sequences are at least {CUDA_MIN_LENGTH} characters long. It is ignored with "
+        "--best-only",
+    )
 
     for prop in Alignments.filter_props:
         prop_ = prop.replace("_", "-")
@@ -275,7 +1012,7 @@ if __name__ == "__main__":
         parser.add_argument(
             f"--{prop_}-operator",
             type=str,
-            choices=["eq"] + list(Alignments.filter_operators),
+            choices=list(Alignments.filter_operators_map_alpha2symbol),
             default="eq",
             help=f"Specify this parameter to filter by {prop} {prop.upper()}_OPERATOR value",
         )
@@ -284,29 +1021,29 @@ if __name__ == "__main__":
 
     seq1 = args.seq1.upper()
     seq2 = args.seq2.upper()
+    # The sequences are handled as arrays of bytes, one per character
+    if not (seq1.isascii() and seq2.isascii()):
+        parser.error("the sequences must only contain ASCII characters")
     match_score = args.match_score
     mismatch_score = args.mismatch_score or -match_score
     gap_penalty = args.gap_penalty
     output_file = args.output_file
     sort_param = args.sort
     reverse_sort = args.reverse_sort
+    fast = args.fast
+    best_only = args.best_only or fast
+    float_scores = args.float_scores
+    band = args.band
+    device = args.device
+    if band is not None and band < 0:
+        parser.error("argument --band: must not be negative")
+    print_matrix = args.print_matrix
     filter_dict = {}
     for prop in Alignments.filter_props:
         value = getattr(args, prop)
         if value is not None:
             operator = getattr(args, f"{prop}_operator")
-            if operator == "eq":
-                filter_dict[prop] = value
-            else:
-                filter_dict[f"{prop}__{operator}"] = value
-
-    scoring_matrix = compute_scoring_matrix(seq1, seq2, match_score, mismatch_score, gap_penalty)
-
-    max_score_cell = max(chain.from_iterable(scoring_matrix))
-
-    best_alignement = traceback_process(scoring_matrix, seq1, seq2, max_score_cell)
-
-    matrix_to_print = printable_matrix(scoring_matrix, seq1, seq2)
+            filter_dict[f"{prop}__{operator}"] = value
 
     if output_file:
         # If the file exists ask the user if he wants to overwrite the file
@@ -327,23 +1064,52 @@ if __name__ == "__main__":
             if choice == "n":
                 sys.exit(0)
 
-        f = open(output_file, "w")
-        f.write(matrix_to_print)
-    print(matrix_to_print)
+    if best_only:
+        best_alignment = None
+        if fast:
+            from smith_waterman_fast import align_parasail
 
-    # Decomment the following and comment all the rest below if you only want the best alignment
-    # print(best_alignment)
+            try:
+                best_alignment = align_parasail(
+                    seq1, seq2, match_score, mismatch_score, gap_penalty
+                )
+            except (ImportError, ValueError) as e:
+                print(f"{Fore.YELLOW}[WARN] {Style.RESET_ALL}{e}, falling back to --best-only")
+        if best_alignment is None:
+            best_alignment = compute_best_alignment(
+                seq1, seq2, match_score, mismatch_score, gap_penalty, float_scores
+            )
+        if output_file:
+            with open(output_file, "w") as f:
+                f.write(best_alignment.to_string(to_file=True))
+        print(best_alignment)
+        sys.exit(0)
 
-    alignments = find_alignments_by_score(scoring_matrix, seq1, seq2)
+    score_matrix = None
+    if device == "cuda" and min(len(seq1), len(seq2)) >= CUDA_MIN_LENGTH:
+        from smith_waterman_cuda import compute_scoring_matrix_cuda
+
+        try:
+            score_matrix, origin_matrix = compute_scoring_matrix_cuda(
+                seq1, seq2, match_score, mismatch_score, gap_penalty, float_scores, band
+            )
+        except ImportError as e:
+            print(f"{Fore.YELLOW}[WARN] {Style.RESET_ALL}{e}, falling back to the CPU")
+    if score_matrix is None:
+        score_matrix, origin_matrix = compute_scoring_matrix(
+            seq1, seq2, match_score, mismatch_score, gap_penalty, float_scores, band
+        )
+
+    # Formatting a large matrix takes longer than computing it, and it is not readable anyway
+    matrix_to_print = ""
+    if print_matrix or score_matrix.size <= PRINT_MATRIX_MAX_CELLS:
+        matrix_to_print = printable_matrix(score_matrix, origin_matrix, seq1, seq2)
+        print(matrix_to_print)
 
     # Change this statement to the following if you want to filter only if arguments are passed:
-    # if filter_dict is not None and filter_dict != {}:
-    #     alignments = alignments.filter(**filter_dict)
-    alignments = (
-        alignments.filter(length__gt=5, score__gt=3)
-        if filter_dict == {}
-        else alignments.filter(**filter_dict)
-    )
+    # filters = filter_dict
+    filters = filter_dict or {"length__gt": 5, "score__gt": 3}
+    alignments = find_alignments_by_score(score_matrix, origin_matrix, seq1, seq2, **filters)
 
     if sort_param is not None:
         alignments.sort(key=sort_param, reverse=reverse_sort)
@@ -351,10 +1117,12 @@ if __name__ == "__main__":
         alignments.sort(key="length", reverse=True)
 
     if output_file:
-        for i, al in enumerate(alignments):
-            f.write(f"Alignment {i}:\n")
-            f.write(al.to_string(to_file=True) + "\n")
-        f.close()
+        # A large buffer lets many alignments be written with a single system call
+        with open(output_file, "w", buffering=1 << 20) as f:
+            f.write(matrix_to_print)
+            f.writelines(
+                f"Alignment {i}:\n{al.to_string(to_file=True)}\n" for i, al in enumerate(alignments)
+            )
 
     if sort_param is None:
         alignments.print(sort_param="length")
@@ -0,0 +1,117 @@
+import math
+
+import numpy as np
+
+from smith_waterman import MOVE_NONE, _update_cell, score_dtypes
+
+try:
+    from numba import cuda
+except ImportError:
+    # numba is optional, without it the scoring matrix is computed on the CPU only
+    cuda = None
+
+# Number of threads of a block, each thread computes a cell of the anti-diagonal
+THREADS_PER_BLOCK = 128
+
+
+def _fill_antidiagonal(
+    score_matrix: np.ndarray,
+    origin_matrix: np.ndarray,
+    a1: np.ndarray,
+    a2: np.ndarray,
+    match_score: float,
+    mismatch_score: float,
+    gap_penalty: float,
+    k: int,
+    i_first: int,
+    i_last: int,
+) -> None:
+    """Computes the cells (i, k - i) of the anti-diagonal k for i from i_first to i_last, one cell
+    per thread"""
+    i = i_first + cuda.grid(1)
+    if i > i_last:
+        return
+
+    j = k - i
+    substitution_score = match_score if a1[i - 1] == a2[j - 1] else mismatch_score
+    _update_cell_device(score_matrix, origin_matrix, substitution_score, i, j, gap_penalty)
+
+
+if cuda is not None:
+    # The cell update of the CPU fills, so that the ties are resolved in the same way
+    _update_cell_device = cuda.jit(device=True)(getattr(_update_cell, "py_func", _update_cell))
+    _fill_antidiagonal = cuda.jit(_fill_antidiagonal)
+
+
+def compute_scoring_matrix_cuda(
+    seq1: str,
+    seq2: str,
+    match_score: float,
+    mismatch_score: float,
+    gap_penalty: float,
+    float_scores: bool = False,
+    band: int = None,
+) -> (np.ndarray, np.ndarray):
+    """This method computes the scoring matrix on a CUDA GPU, one anti-diagonal at a time
+    Args:
+        seq1 (str): the first sequence
+        seq2 (str): the second sequence
+        match_score (float): the score for the match
+        mismatch_score (float): the score for the mismatch
+        gap_penalty (float): the penalty fot the gap
+        float_scores (bool): if True the scores are stored as float64 even when they are integers
+        band (int): if given only the cells (i, j) with |i - j| <= band are computed, as in
+            compute_scoring_matrix()
+    Returns:
+        A tuple containing the matrix of the scores and the matrix of the origins of each cell,
+        equal to the ones of compute_scoring_matrix()
+    """
+    if cuda is None:
+        raise ImportError("numba is not installed, install it with pip install numba")
+    if not cuda.is_available():
+        raise ImportError("no CUDA GPU is available")
+    if band is not None and band < 0:
+        raise ValueError(f"The band must not be negative, got {band}")
+
+    n = len(seq1) + 1
+    m = len(seq2) + 1
+
+    if float_scores:
+        dtype = np.dtype(np.float64)
+    else:
+        dtype, _ = score_dtypes(match_score, mismatch_score, gap_penalty, len(seq1) + len(seq2))
+
+    score_matrix = cuda.to_device(np.zeros((n, m), dtype=dtype))
+    origin_matrix = cuda.to_device(np.full((n, m), MOVE_NONE, dtype=np.uint8))
+    a1 = cuda.to_device(np.frombuffer(seq1.encode("ascii"), dtype=np.uint8))
+    a2 = cuda.to_device(np.frombuffer(seq2.encode("ascii"), dtype=np.uint8))
+
+    if band is not None and not len(seq2) / 2 <= len(seq1) <= 2 * len(seq2):
+        band = None
+    if band is None:
+        band = max(n, m)
+
+    # The anti-diagonal k holds the cells with i + j = k. Each one only depends on the two previous
+    # ones, and the kernels launched on the same stream run one after the other
+    for k in range(2, n + m - 1):
+        # Rows of the cells of the anti-diagonal, within the band |i - (k - i)| <= band
+        i_first = max(1, k - m + 1, math.ceil((k - band) / 2))
+        i_last = min(n - 1, k - 1, (k + band) // 2)
+        if i_first > i_last:
+            continue
+
+        blocks = (i_last - i_first + THREADS_PER_BLOCK) // THREADS_PER_BLOCK
+        _fill_antidiagonal[blocks, THREADS_PER_BLOCK](
+            score_matrix,
+            origin_matrix,
+            a1,
+            a2,
+            dtype.type(match_score),
+            dtype.type(mismatch_score),
+            dtype.type(gap_penalty),
+            k,
+            i_first,
+            i_last,
+        )
+
+    return score_matrix.copy_to_host(), origin_matrix.copy_to_host()
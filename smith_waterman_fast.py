@@ -0,0 +1,59 @@
+from alignment import Alignment
+from smith_waterman import gap_lengths, score_dtypes
+
+try:
+    import parasail
+except ImportError:
+    # parasail is optional, without it the alignments are computed by smith_waterman only
+    parasail = None
+
+
+def align_parasail(
+    seq1: str, seq2: str, match_score: float, mismatch_score: float, gap_penalty: float
+) -> Alignment:
+    """This method computes the best alignment with the striped SIMD implementation of parasail
+    Args:
+        seq1 (str): the first sequence
+        seq2 (str): the second sequence
+        match_score (float): the score for the match
+        mismatch_score (float): the score for the mismatch
+        gap_penalty (float): the penalty fot the gap
+    Returns:
+        The alignment with the best score, equal in score to the one of compute_best_alignment()
+        but possibly different when several alignments have the same score
+    """
+    if parasail is None:
+        raise ImportError("parasail is not installed, install it with pip install parasail")
+
+    # parasail does not accept empty sequences, which have no alignment anyway
+    if not seq1 or not seq2:
+        return Alignment("", "", 0, max(len(seq1), len(seq2)), 0, 0.0, (0, 0))
+
+    dtype, _ = score_dtypes(match_score, mismatch_score, gap_penalty, len(seq1) + len(seq2))
+    if dtype.kind != "i":
+        raise ValueError("parasail only supports integer scores")
+    sw_trace = parasail.sw_trace_striped_16 if dtype.itemsize == 2 else parasail.sw_trace_striped_32
+
+    # A linear gap penalty is an affine one where opening and extending a gap cost the same
+    matrix = parasail.matrix_create(
+        "".join(set(seq1 + seq2)), int(match_score), int(mismatch_score)
+    )
+    result = sw_trace(seq1, seq2, int(-gap_penalty), int(-gap_penalty), matrix)
+
+    # Without positive cells there is no alignment, and parasail does not report a meaningful score
+    if result.score <= 0:
+        return Alignment("", "", 0, max(len(seq1), len(seq2)), 0, 0.0, (0, 0))
+
+    subseq1 = result.traceback.query.encode("ascii")
+    subseq2 = result.traceback.ref.encode("ascii")
+    gaps = gap_lengths(subseq1, subseq2)
+
+    return Alignment(
+        subseq1,
+        subseq2,
+        max(gaps, default=0),
+        min(gaps, default=max(len(seq1), len(seq2))),
+        len(gaps),
+        float(result.score),
+        (result.end_query + 1, result.end_ref + 1),
+    )
@@ -0,0 +1,114 @@
+import random
+import unittest
+
+import numpy as np
+
+from alignment import Alignments
+from smith_waterman import (
+    _best_cell,
+    _best_cell_striped,
+    _striped_profile,
+    compute_scoring_matrix,
+    find_alignments_by_score,
+    njit,
+    score_dtypes,
+    traceback_process,
+)
+
+OPERATORS = ["eq", "neq", "gt", "gte", "lt", "lte"]
+
+
+def random_sequence(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def path_cells(alignment) -> list:
+    """Returns the cells visited by the traceback process of the alignment, from its start"""
+    i, j = alignment.indices
+    cells = []
+    for c1, c2 in zip(reversed(alignment.subseq1), reversed(alignment.subseq2)):
+        cells.append((i, j))
+        i -= c1 != ord("-")
+        j -= c2 != ord("-")
+    return cells
+
+
+def reference_alignments(score_matrix, origin_matrix, seq1, seq2, **filters) -> Alignments:
+    """Traces every positive cell by decreasing score, ties in row-major order, skipping the cells
+    already on the path of a previous alignment, and filters the alignments afterwards"""
+    starts = [tuple(cell) for cell in np.argwhere(score_matrix > 0).tolist()]
+    starts.sort(key=lambda cell: -score_matrix[cell])
+
+    alignments, visited = [], set()
+    for start in starts:
+        if start in visited:
+            continue
+        alignment = traceback_process(score_matrix, origin_matrix, seq1, seq2, start)
+        visited.update(path_cells(alignment))
+        alignments.append(alignment)
+
+    return Alignments(alignments).filter(**filters)
+
+
+def summary(alignments) -> list:
+    return sorted((a.indices, a.subseq1, a.subseq2, a.score) for a in alignments)
+
+
+class FindAlignmentsByScoreTest(unittest.TestCase):
+    def test_equals_tracing_every_cell_then_filtering(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            seq1 = random_sequence(rng, rng.randint(0, 25))
+            seq2 = random_sequence(rng, rng.randint(0, 25))
+            scores = rng.choice([(3, -3, -2), (2, -1, -1), (2.5, -1.5, -1)])
+            props = rng.sample(["score", "length", "n_gaps", "num_matches"], rng.randint(0, 3))
+            filters = {f"{prop}__{rng.choice(OPERATORS)}": rng.randint(0, 12) for prop in props}
+
+            score_matrix, origin_matrix = compute_scoring_matrix(seq1, seq2, *scores)
+            expected = reference_alignments(score_matrix, origin_matrix, seq1, seq2, **filters)
+            found = find_alignments_by_score(score_matrix, origin_matrix, seq1, seq2, **filters)
+
+            self.assertEqual(summary(found), summary(expected), (seq1, seq2, scores, filters))
+
+    def test_score_filters_do_not_return_parts_of_better_alignments(self):
+        score_matrix, origin_matrix = compute_scoring_matrix("ACGTAC", "ACGTAC", 3, -3, -2)
+        alignments = find_alignments_by_score(
+            score_matrix, origin_matrix, "ACGTAC", "ACGTAC", score__lt=10
+        )
+        self.assertNotIn((3, 3), [a.indices for a in alignments])
+
+
+@unittest.skipIf(njit is None, "the striped kernel needs numba")
+class BestCellStripedTest(unittest.TestCase):
+    def assert_same_best_cell(self, seq1, seq2, match_score, mismatch_score, gap_penalty):
+        a1 = np.frombuffer(seq1.encode("ascii"), dtype=np.uint8)
+        a2 = np.frombuffer(seq2.encode("ascii"), dtype=np.uint8)
+        dtype, _ = score_dtypes(match_score, mismatch_score, gap_penalty, len(seq1) + len(seq2))
+        profile, index = _striped_profile(a1, match_score, mismatch_score, dtype)
+
+        score, i, j = _best_cell_striped(profile, index[a2], gap_penalty)
+        expected = _best_cell(a1, a2, float(match_score), float(mismatch_score), float(gap_penalty))
+        self.assertEqual((float(score), i, j), tuple(expected), (seq1, seq2))
+
+    def test_random_sequences(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            seq1 = random_sequence(rng, rng.randint(0, 70))
+            seq2 = random_sequence(rng, rng.randint(0, 70))
+            scores = rng.choice([(3, -3, -2), (2, -1, -1), (1, -1, -1), (5, -4, -1)])
+            self.assert_same_best_cell(seq1, seq2, *scores)
+
+    def test_long_vertical_gaps(self):
+        # An insertion in seq1 is a run of vertical moves, which spans several segments of the
+        # striped profile and needs the lazy-F loop
+        rng = random.Random(2)
+        for _ in range(100):
+            prefix = random_sequence(rng, rng.randint(5, 40))
+            suffix = random_sequence(rng, rng.randint(5, 40))
+            insertion = random_sequence(rng, rng.randint(16, 80))
+            scores = rng.choice([(3, -3, -1), (5, -4, -1), (2, -2, -1)])
+            self.assert_same_best_cell(prefix + insertion + suffix, prefix + suffix, *scores)
+
+
+if __name__ == "__main__":
+    unittest.main()